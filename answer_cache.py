@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_THRESHOLD = float(os.getenv("EXCIUM_CACHE_THRESHOLD", "0.9"))
+CACHE_SIZE = int(os.getenv("EXCIUM_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.getenv("EXCIUM_CACHE_TTL", "3600"))
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SemanticAnswerCache:
+    """Answer lookup keyed by query embedding.
+
+    Predefined Q&A from every category live in a fixed, pre-normalised matrix; exact matches are
+    answered by the QnaIndex before any embedding and counted here as "exact" hits. LLM answers
+    go into a preallocated ring of slots with LRU + TTL eviction. They are keyed by the question
+    alone, so callers only use them for questions that need no conversation history. A cache
+    belongs to one document index; the runtime builds a new one when the index changes.
+    """
+
+    def __init__(self, embeddings, threshold=CACHE_THRESHOLD, max_entries=CACHE_SIZE, ttl=CACHE_TTL):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = {"predefined": 0, "generated": 0}
+        self.misses = 0
+        self.qna = None
+        self._lock = threading.Lock()
+        self._predefined_answers = []
+        self._predefined = np.zeros((0, 0), dtype=np.float32)
+        self._generated = None
+        self._expires = np.full(max_entries, -np.inf)
+        self._slots = OrderedDict()  # slot -> answer, in LRU order
+        self._free = list(range(max_entries - 1, -1, -1))
+
+    # ------------------ Population ------------------
+    def add_predefined(self, qna):
+        """Index (or re-index) the predefined Q&A of a QnaIndex, replacing any previous set."""
+        self.qna = qna
+        pairs = [(q, a) for entries in qna.qna.values() for q, a in entries]
+        if not pairs:
+            return
+        vectors = _unit(self.embeddings.embed_documents([q for q, _ in pairs]))
+        with self._lock:
+            self._predefined_answers = [a for _, a in pairs]
+            self._predefined = vectors
+
+    def inherit_stats(self, previous):
+        """Continue previous's hit/miss counters, so a reload does not reset the traffic metrics."""
+        self.hits, self.misses = dict(previous.hits), previous.misses
+
+    def add(self, vector, answer):
+        if vector is None or self.max_entries <= 0:
+            return
+        vector = _unit(vector)
+        with self._lock:
+            if self._generated is None:
+                self._generated = np.zeros((self.max_entries, vector.shape[-1]), dtype=np.float32)
+            self._expire(time.monotonic())
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot, _ = self._slots.popitem(last=False)
+            self._generated[slot] = vector
+            self._expires[slot] = time.monotonic() + self.ttl
+            self._slots[slot] = answer
+
+    def _expire(self, now):
+        # Caller holds the lock. Free slots keep expiry -inf, hence the membership check.
+        for slot in np.flatnonzero(self._expires < now).tolist():
+            if self._slots.pop(slot, None) is not None:
+                self._expires[slot] = -np.inf
+                self._free.append(slot)
+
+    # ------------------ Lookup ------------------
+    def match(self, query, generated=True):
+        """Return (answer or None, query vector); pass the vector to add() on a miss.
+
+        Pass generated=False for follow-ups that depend on the conversation: their answers
+        belong to one session, so only the predefined Q&A are searched.
+        """
+        vector = _unit(self.embeddings.embed_query(query))
+        with self._lock:
+            if len(self._predefined_answers):
+                scores = self._predefined @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits["predefined"] += 1
+                    return self._predefined_answers[best], vector
+
+            self._expire(time.monotonic())
+            if generated and self._slots:
+                scores = self._generated @ vector
+                scores[self._expires == -np.inf] = -np.inf
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold and best in self._slots:
+                    self._slots.move_to_end(best)
+                    self.hits["generated"] += 1
+                    return self._slots[best], vector
+
+            self.misses += 1
+        return None, vector
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+        counts = {"exact": self.qna.hits if self.qna else 0, **self.hits}
+        hits = sum(counts.values())
+        total = hits + self.misses
+        return {**counts, "hits": hits, "misses": self.misses,
+                "hit_rate": round(hits / total, 3) if total else 0.0, "generated_entries": len(self._slots)}
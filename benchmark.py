@@ -0,0 +1,182 @@
+import argparse
+import json
+import resource
+import shutil
+import tempfile
+from pathlib import Path
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from index_store import DATA_DIR, INDEX_DIR, make_embeddings, open_index, rebuild_index
+from metrics import LatencyLog, StageTimer, timed_stream
+from qna import load_qna
+from rag import build_chain, make_llm
+
+PARAPHRASES = [
+    "{q}",
+    "{lower}",
+    "Can you tell me {lower}",
+    "Quick question: {lower}",
+    "{bare}, please?",
+]
+FOLLOW_UPS = [
+    "How much does that cost?",
+    "Can you tell me more about it?",
+    "What are the deadlines for those?",
+    "Is that also available online?",
+]
+
+
+# ------------------ Local LLM stand-in ------------------
+class LocalChatModel(BaseChatModel):
+    """Deterministic offline stand-in for ChatGroq with a fixed first-token and per-token delay.
+
+    Rewrite prompts echo the question back; QA prompts answer with the first max_tokens words of
+    the retrieved context, so the chain does the same work as with a real model.
+    """
+
+    first_token_delay: float = 0.2
+    token_delay: float = 0.01
+    max_tokens: int = 64
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-stand-in"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        system = messages[0].content if messages else ""
+        question = messages[-1].content if messages else ""
+        if system.startswith("Turn the latest user message"):
+            return question
+        context = system.split("context:", 1)[-1]
+        return " ".join((context.split() or question.split())[: self.max_tokens])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        text = self._respond(messages)
+        time.sleep(self.first_token_delay + self.token_delay * len(text.split()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_delay)
+        for i, word in enumerate(self._respond(messages).split()):
+            token = word if i == 0 else f" {word}"
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(self.token_delay)
+
+
+# ------------------ Query corpus ------------------
+def query_corpus(qna=None, paraphrases=PARAPHRASES, follow_up_every=4):
+    """Predefined questions in several phrasings, with a history-dependent follow-up every few queries."""
+    qna = qna if qna is not None else load_qna()
+    queries = []
+    for entries in qna.values():
+        for q, _ in entries:
+            for template in paraphrases:
+                queries.append(template.format(q=q, lower=q[0].lower() + q[1:], bare=q.rstrip("?")))
+                if follow_up_every and len(queries) % follow_up_every == 0:
+                    queries.append(FOLLOW_UPS[len(queries) % len(FOLLOW_UPS)])
+    return queries
+
+
+# ------------------ Runner ------------------
+def peak_rss_mb():
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"self": round(self_kb / 1024, 1), "children": round(children_kb / 1024, 1)}
+
+
+def run_session(chain, session_id, queries, timer, e2e_log):
+    for query in queries:
+        chunks = chain.stream(
+            {"input": query},
+            config={"configurable": {"session_id": session_id}, "callbacks": [timer]},
+        )
+        for _ in timed_stream((c.get("answer", "") for c in chunks), e2e_log):
+            pass
+
+
+def run_load(chain, queries, sessions, tag):
+    """Replay queries round-robin over `sessions` concurrent sessions and summarize latencies."""
+    # Unbounded logs: percentiles must cover every query, not the most recent window.
+    timer, e2e_log = StageTimer(LatencyLog(maxlen=None)), LatencyLog(maxlen=None)
+    batches = [queries[i::sessions] for i in range(sessions)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(sessions) as pool:
+        futures = [pool.submit(run_session, chain, f"{tag}-{sessions}-{i}", batch, timer, e2e_log)
+                   for i, batch in enumerate(batches)]
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "queries": len(queries),
+        "wall_s": round(wall, 3),
+        "queries_per_s": round(len(queries) / wall, 2),
+        "end_to_end": e2e_log.summary(),
+        "stages": timer.log.summary(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the ExciumEdu RAG chain.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--ingest", action="store_true", help="also time a full rebuild into a temporary index")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N queries")
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--groq", action="store_true", help="use the real ChatGroq model instead of the stand-in")
+    parser.add_argument("--out", default=None, help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    report = {}
+    t0 = time.perf_counter()
+    embeddings = make_embeddings()
+    report["embedding_model_load_s"] = round(time.perf_counter() - t0, 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        if args.ingest:
+            vectorstore, report["ingest"] = rebuild_index(embeddings, args.data_dir, tmp, args.workers)
+        else:
+            # Open a copy: a persistent Chroma client writes its in-memory copy back at exit, which
+            # would overwrite anything the live app synced into the production index meanwhile.
+            index_copy = Path(tmp) / "index"
+            if Path(args.index_dir).exists():
+                shutil.copytree(args.index_dir, index_copy)
+            vectorstore = open_index(embeddings, str(index_copy))
+        report["index_open_s"] = round(time.perf_counter() - t0, 3)
+
+        t0 = time.perf_counter()
+        llm = make_llm() if args.groq else LocalChatModel(
+            first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+        chain = build_chain(llm, vectorstore)
+        report["chain_build_s"] = round(time.perf_counter() - t0, 3)
+
+        queries = query_corpus()[: args.limit]
+        report["runs"] = [run_load(chain, queries, n, "bench") for n in args.concurrency]
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
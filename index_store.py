@@ -0,0 +1,245 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+DATA_DIR = os.getenv("EXCIUM_DATA_DIR", "data")
+INDEX_DIR = os.getenv("EXCIUM_INDEX_DIR", "chroma_db")
+COLLECTION = "exciumedu"
+MANIFEST_FILE = "manifest.json"
+EMBED_MODEL = "sentence-transformers/all-mpnet-base-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+
+
+# ------------------ Manifest ------------------
+def index_settings():
+    return {"model": EMBED_MODEL, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_ids(source, chunks):
+    # Chunk IDs are content hashes, so an edited file only re-embeds the chunks that changed.
+    ids, seen = [], {}
+    for chunk in chunks:
+        digest = hashlib.sha256(f"{source}\0{chunk.page_content}".encode("utf-8")).hexdigest()
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(digest if seen[digest] == 1 else f"{digest}-{seen[digest]}")
+    return ids
+
+
+def load_manifest(index_dir=INDEX_DIR):
+    path = Path(index_dir) / MANIFEST_FILE
+    if not path.exists():
+        return {"settings": index_settings(), "files": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, index_dir=INDEX_DIR):
+    path = Path(index_dir) / MANIFEST_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def index_fingerprint(index_dir=INDEX_DIR):
+    """Short hash of the manifest; changes whenever any indexed chunk is added or removed."""
+    manifest = {k: v for k, v in load_manifest(index_dir).items() if k != "failed"}
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def scan_data_dir(data_dir=DATA_DIR):
+    return {p.relative_to(data_dir).as_posix(): p for p in sorted(Path(data_dir).glob("**/*.docx"))}
+
+
+# ------------------ Index ------------------
+_locks = {}
+
+
+def lock_index(index_dir=INDEX_DIR):
+    """Hold an exclusive lock on index_dir for the life of the process.
+
+    A Chroma client keeps the whole collection in memory and writes it back at exit, so two
+    processes on one index directory overwrite each other's changes; the second one fails here.
+    """
+    path = Path(index_dir).resolve()
+    if path in _locks:
+        return
+    try:
+        import fcntl
+    except ImportError:  # no advisory locks on Windows; stay single-process by convention
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path.with_name(path.name + ".lock"), "w")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        raise RuntimeError(f"{index_dir} is in use by another process; serve several workers from an "
+                           "mmap export (EXCIUM_MMAP_INDEX) instead.") from None
+    _locks[path] = handle
+
+
+# LangChain, Chroma and the ingest stack are imported on first use so that importing this
+# module for its settings stays cheap.
+def make_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+
+
+def open_index(embeddings, index_dir=INDEX_DIR):
+    from langchain_community.vectorstores import Chroma
+
+    lock_index(index_dir)
+    return Chroma(collection_name=COLLECTION, embedding_function=embeddings, persist_directory=index_dir)
+
+
+def sync_index(vectorstore, data_dir=DATA_DIR, index_dir=INDEX_DIR, workers=None):
+    """Bring the persisted index in line with the .docx files under data_dir.
+
+    A file that fails to parse is left out (or keeps its previously indexed version), recorded
+    under "failed" in the manifest and the returned stats, and retried once its contents change.
+    """
+    from ingest import IngestPipeline
+
+    manifest = load_manifest(index_dir)
+    if manifest.get("settings") != index_settings():
+        raise RuntimeError(f"Index in {index_dir} was built with different settings; run a rebuild.")
+
+    files = scan_data_dir(data_dir)
+    known = manifest["files"]
+    failed = manifest.setdefault("failed", {})
+    failed_before = dict(failed)
+    stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0, "chunks_embedded": 0, "chunks_deleted": 0}
+    stale = []
+
+    for rel in sorted(set(known) - set(files)):
+        stale.extend(known.pop(rel)["chunks"])
+        stats["removed"] += 1
+    for rel in set(failed) - set(files):
+        del failed[rel]
+
+    digests, todo = {}, []
+    for rel, path in files.items():
+        digests[rel] = file_hash(path)
+        entry = known.get(rel)
+        if entry and entry["sha256"] == digests[rel]:
+            failed.pop(rel, None)
+            stats["unchanged"] += 1
+        elif failed.get(rel, {}).get("sha256") != digests[rel]:
+            todo.append((rel, path))
+
+    def on_file(rel, chunks):
+        ids = chunk_ids(rel, chunks)
+        entry = known.get(rel)
+        old_ids = set(entry["chunks"]) if entry else set()
+        new_ids = set(ids)
+        stale.extend(i for i in old_ids if i not in new_ids)
+        known[rel] = {"sha256": digests[rel], "chunks": ids}
+        failed.pop(rel, None)
+        stats["changed" if entry else "added"] += 1
+        fresh = [(i, c) for i, c in zip(ids, chunks) if i not in old_ids]
+        stats["chunks_embedded"] += len(fresh)
+        return fresh
+
+    def on_error(rel, error):
+        failed[rel] = {"sha256": digests[rel], "error": error}
+
+    if todo:
+        pipeline = IngestPipeline(vectorstore, CHUNK_SIZE, CHUNK_OVERLAP, workers=workers)
+        stats["throughput"] = pipeline.run(todo, on_file, on_error)
+    if stale:
+        vectorstore.delete(ids=stale)
+        stats["chunks_deleted"] = len(stale)
+
+    if stats["added"] or stats["changed"] or stats["removed"]:
+        vectorstore.persist()
+    if stats["added"] or stats["changed"] or stats["removed"] or failed != failed_before:
+        save_manifest(manifest, index_dir)
+    stats["failed"] = {rel: entry["error"] for rel, entry in sorted(failed.items())}
+    return stats
+
+
+def verify_index(vectorstore, data_dir=DATA_DIR, index_dir=INDEX_DIR):
+    """Return a list of problems; an empty list means the index matches data_dir."""
+    manifest = load_manifest(index_dir)
+    problems = []
+    if manifest.get("settings") != index_settings():
+        problems.append(f"settings mismatch: {manifest.get('settings')} != {index_settings()}")
+
+    files = scan_data_dir(data_dir)
+    known = manifest["files"]
+    failed = manifest.get("failed", {})
+    for rel in sorted(set(failed) & set(files)):
+        problems.append(f"failed to parse: {rel} ({failed[rel]['error']})")
+    for rel in sorted(set(files) - set(known) - set(failed)):
+        problems.append(f"not indexed: {rel}")
+    for rel in sorted(set(known) - set(files)):
+        problems.append(f"indexed but missing on disk: {rel}")
+    for rel in sorted((set(files) & set(known)) - set(failed)):
+        if file_hash(files[rel]) != known[rel]["sha256"]:
+            problems.append(f"stale: {rel}")
+
+    expected = {i for entry in known.values() for i in entry["chunks"]}
+    stored = set(vectorstore.get(include=[])["ids"])
+    if expected - stored:
+        problems.append(f"{len(expected - stored)} chunk(s) in manifest but not in the vector store")
+    if stored - expected:
+        problems.append(f"{len(stored - expected)} orphan chunk(s) in the vector store")
+    return problems
+
+
+def rebuild_index(embeddings, data_dir=DATA_DIR, index_dir=INDEX_DIR, workers=None):
+    lock_index(index_dir)
+    shutil.rmtree(index_dir, ignore_errors=True)
+    vectorstore = open_index(embeddings, index_dir)
+    return vectorstore, sync_index(vectorstore, data_dir, index_dir, workers)
+
+
+def load_index(embeddings, data_dir=DATA_DIR, index_dir=INDEX_DIR):
+    """Reopen the persisted index and apply any .docx additions, edits or deletions."""
+    vectorstore = open_index(embeddings, index_dir)
+    sync_index(vectorstore, data_dir, index_dir)
+    return vectorstore
+
+
+# ------------------ CLI ------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and check the persisted ExciumEdu document index.")
+    parser.add_argument("command", choices=["sync", "rebuild", "verify"])
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    embeddings = make_embeddings()
+    if args.command == "rebuild":
+        _, stats = rebuild_index(embeddings, args.data_dir, args.index_dir, args.workers)
+        print(json.dumps(stats))
+        return 0
+    vectorstore = open_index(embeddings, args.index_dir)
+    if args.command == "sync":
+        print(json.dumps(sync_index(vectorstore, args.data_dir, args.index_dir, args.workers)))
+        return 0
+    problems = verify_index(vectorstore, args.data_dir, args.index_dir)
+    for problem in problems:
+        print(problem)
+    print("index OK" if not problems else f"{len(problems)} problem(s) found")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+BATCH_SIZE = int(os.getenv("EXCIUM_EMBED_BATCH", "64"))
+QUEUED_BATCHES = 4
+_DONE = object()
+
+
+# ------------------ Parse stage (process pool) ------------------
+_splitter = None
+
+
+def _init_worker(chunk_size, chunk_overlap):
+    global _splitter
+    _splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def _split_file(path):
+    docs = UnstructuredWordDocumentLoader(str(path)).load()
+    return _splitter.split_documents(docs)
+
+
+def _parse_file(rel, path):
+    # Errors come back as text: one bad document must not sink the whole run, and not every
+    # exception pickles across the process boundary.
+    try:
+        return rel, _split_file(path), None
+    except Exception as exc:
+        return rel, [], f"{type(exc).__name__}: {exc}"
+
+
+def iter_parsed(files, chunk_size, chunk_overlap, workers=None, max_inflight=None):
+    """Yield (rel, chunks, error) per file as parsing finishes, keeping at most max_inflight files
+    in flight; error is None on success, else a one-line description of why parsing failed."""
+    files = list(files)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(files) <= 1:
+        _init_worker(chunk_size, chunk_overlap)
+        for rel, path in files:
+            yield _parse_file(rel, path)
+        return
+
+    max_inflight = max_inflight or workers * 2
+    pending = iter(files)
+    # Spawn, not fork: sync can run on a background thread of a process that already has torch
+    # and tokenizer thread pools, and forking such a process can deadlock the children.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(chunk_size, chunk_overlap)) as pool:
+        inflight = set()
+        while True:
+            while len(inflight) < max_inflight:
+                item = next(pending, None)
+                if item is None:
+                    break
+                inflight.add(pool.submit(_parse_file, *item))
+            if not inflight:
+                return
+            done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+# ------------------ Embed + write stage ------------------
+class IngestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.files = self.chunks = self.embeddings = 0
+        self.failed = {}
+        self.parse_s = self.embed_s = self.write_s = 0.0
+
+    def report(self):
+        wall = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "files": self.files,
+            "chunks": self.chunks,
+            "embeddings": self.embeddings,
+            "wall_s": round(wall, 3),
+            "files_per_s": round(self.files / wall, 2),
+            "chunks_per_s": round(self.chunks / wall, 2),
+            "embeddings_per_s": round(self.embeddings / max(self.embed_s, 1e-9), 2),
+            "embed_s": round(self.embed_s, 3),
+            "write_s": round(self.write_s, 3),
+            "parse_wait_s": round(self.parse_s, 3),
+            "failed": self.failed,
+        }
+
+
+class IngestPipeline:
+    """Parse .docx files in a process pool and stream fixed-size chunk batches into the vector store.
+
+    A bounded queue sits between the parse stage and the embed/write thread, so the parser
+    blocks when embedding falls behind and peak memory is independent of corpus size.
+    """
+
+    def __init__(self, vectorstore, chunk_size, chunk_overlap, workers=None,
+                 batch_size=BATCH_SIZE, queued_batches=QUEUED_BATCHES):
+        self.vectorstore = vectorstore
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queued_batches = queued_batches
+
+    def _writer(self, batches, stats, errors):
+        embeddings = self.vectorstore.embeddings
+        collection = self.vectorstore._collection
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                return
+            if errors:
+                continue
+            try:
+                ids = [i for i, _ in batch]
+                texts = [c.page_content for _, c in batch]
+                t0 = time.perf_counter()
+                vectors = embeddings.embed_documents(texts)
+                t1 = time.perf_counter()
+                collection.upsert(ids=ids, embeddings=vectors, documents=texts,
+                                  metadatas=[c.metadata for _, c in batch])
+                stats.embed_s += t1 - t0
+                stats.write_s += time.perf_counter() - t1
+                stats.embeddings += len(batch)
+            except Exception as exc:
+                errors.append(exc)
+
+    def run(self, files, on_file, on_error=None):
+        """Ingest (rel, path) pairs; on_file(rel, chunks) returns the (id, chunk) pairs to embed.
+
+        Files that fail to parse are skipped, passed to on_error(rel, error) and listed under
+        "failed" in the report; a failed embed or write aborts the run.
+        """
+        stats = IngestStats()
+        batches = queue.Queue(maxsize=self.queued_batches)
+        errors = []
+        writer = threading.Thread(target=self._writer, args=(batches, stats, errors), daemon=True)
+        writer.start()
+
+        batch = []
+        try:
+            parsed = iter_parsed(files, self.chunk_size, self.chunk_overlap, self.workers)
+            while not errors:
+                t0 = time.perf_counter()
+                item = next(parsed, None)
+                stats.parse_s += time.perf_counter() - t0
+                if item is None:
+                    break
+                rel, chunks, error = item
+                if error is not None:
+                    stats.failed[rel] = error
+                    if on_error is not None:
+                        on_error(rel, error)
+                    continue
+                stats.files += 1
+                stats.chunks += len(chunks)
+                for pair in on_file(rel, chunks):
+                    batch.append(pair)
+                    if len(batch) >= self.batch_size:
+                        batches.put(batch)
+                        batch = []
+            if batch and not errors:
+                batches.put(batch)
+        finally:
+            batches.put(_DONE)
+            writer.join()
+        if errors:
+            raise errors[0]
+        return stats.report()
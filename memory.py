@@ -0,0 +1,148 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import SystemMessage, get_buffer_string
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableBranch
+
+MAX_SESSIONS = int(os.getenv("EXCIUM_MAX_SESSIONS", "1000"))
+SESSION_IDLE_TTL = float(os.getenv("EXCIUM_SESSION_IDLE_TTL", "1800"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("EXCIUM_HISTORY_TOKENS", "1200"))
+# "always" rewrites every follow-up; "auto" also skips questions the regex heuristic deems standalone,
+# which saves an LLM call but can miss follow-ups without a pronoun ("And the deadline?").
+REWRITE_MODE = os.getenv("EXCIUM_REWRITE_MODE", "always")
+
+# Words that usually point back at earlier turns ("how much does it cost?").
+_REFERENTIAL = re.compile(
+    r"\b(it|its|it's|that|this|these|those|they|them|their|there|he|she|his|her|one|ones|"
+    r"above|previous|earlier|same|more|else|also|again|another|other)\b",
+    re.IGNORECASE,
+)
+
+
+def count_tokens(text):
+    # ~4 characters per token is close enough for budgeting English prompts.
+    return max(1, len(text) // 4)
+
+
+class WindowedChatHistory(BaseChatMessageHistory):
+    """Chat history that keeps only the most recent messages within a token budget.
+
+    Messages pushed out of the window are dropped, or folded into a rolling summary when a
+    summarizer LLM is given; the summary is replayed as a leading system message.
+    """
+
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, summarizer=None):
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self._messages = []
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self):
+        with self._lock:
+            window = list(self._messages)
+        if self.summary:
+            window.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        return window
+
+    def add_message(self, message):
+        with self._lock:
+            self._messages.append(message)
+            dropped = self._trim()
+        if dropped and self.summarizer is not None:
+            self._summarize(dropped)
+
+    def _trim(self):
+        used = sum(count_tokens(m.content) for m in self._messages)
+        dropped = []
+        # Always keep the latest exchange, even if it alone exceeds the budget.
+        while used > self.token_budget and len(self._messages) > 2:
+            message = self._messages.pop(0)
+            used -= count_tokens(message.content)
+            dropped.append(message)
+        return dropped
+
+    def _summarize(self, dropped):
+        prompt = (
+            "Update the running summary of a conversation between a student and an educational "
+            "counselor. Keep it under 80 words.\n\n"
+            f"Current summary: {self.summary or '(none)'}\n\nNew lines:\n{get_buffer_string(dropped)}"
+        )
+        try:
+            self.summary = StrOutputParser().invoke(self.summarizer.invoke(prompt)).strip()
+        except Exception:
+            pass  # Losing the summary only costs context, never the answer.
+
+    def clear(self):
+        with self._lock:
+            self._messages = []
+            self.summary = ""
+
+
+class SessionMemoryStore:
+    """Per-session histories with LRU eviction past max_sessions and idle expiry."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_ttl=SESSION_IDLE_TTL,
+                 token_budget=HISTORY_TOKEN_BUDGET, summarizer=None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self._sessions = OrderedDict()  # session_id -> (history, last_used)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            if session_id in self._sessions:
+                history, _ = self._sessions.pop(session_id)
+            else:
+                history = WindowedChatHistory(self.token_budget, self.summarizer)
+                # Make room only for a new session; an existing one is just moved to the end.
+                while self._sessions and len(self._sessions) >= self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions[session_id] = (history, now)
+            return history
+
+    def _evict(self, now):
+        while self._sessions:
+            _, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# ------------------ History-aware retrieval ------------------
+def is_standalone(question):
+    return len(question.split()) >= 4 and not _REFERENTIAL.search(question)
+
+
+def answer_is_shareable(messages, question):
+    """True when the answer to question does not depend on the conversation so far, so it may be
+    cached and reused across sessions."""
+    return not messages or is_standalone(question)
+
+
+def make_history_aware_retriever(llm, retriever, prompt, mode=REWRITE_MODE):
+    """Like create_history_aware_retriever, but in "auto" mode also skips the rewrite LLM call
+    for questions that already read as standalone."""
+
+    def skip_rewrite(inputs):
+        if not inputs.get("chat_history"):
+            return True
+        return mode == "auto" and is_standalone(inputs["input"])
+
+    return RunnableBranch(
+        (skip_rewrite, (lambda x: x["input"]) | retriever),
+        prompt | llm | StrOutputParser() | retriever,
+    ).with_config(run_name="chat_retriever_chain")
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+STAGE_TAG_PREFIX = "stage:"
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+class LatencyLog:
+    """Thread-safe ring buffer of per-request timings (seconds)."""
+
+    def __init__(self, maxlen=1000):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, **timings):
+        with self._lock:
+            self._records.append(timings)
+
+    def last(self):
+        with self._lock:
+            return dict(self._records[-1]) if self._records else None
+
+    def summary(self, pcts=(50, 95, 99)):
+        with self._lock:
+            records = list(self._records)
+        fields = sorted({k for r in records for k in r})
+        return {
+            field: {f"p{p}": percentile([r[field] for r in records if field in r], p) for p in pcts}
+            for field in fields
+        }
+
+
+def timed_stream(tokens, log, **extra):
+    """Pass tokens through, recording time-to-first-token and total latency once exhausted."""
+    start = time.perf_counter()
+    ttft = None
+    for token in tokens:
+        if ttft is None and token:
+            ttft = time.perf_counter() - start
+        yield token
+    total = time.perf_counter() - start
+    log.record(ttft=ttft if ttft is not None else total, total=total, **extra)
+
+
+# ------------------ Per-stage timing ------------------
+def stage_tag(name):
+    return f"{STAGE_TAG_PREFIX}{name}"
+
+
+class StageTimer(BaseCallbackHandler):
+    """Callback handler timing every LLM or retriever run tagged with stage_tag(...) into a LatencyLog.
+
+    Pass it in the chain's config callbacks; records are keyed by stage name, and the
+    first streamed token of a stage adds a "<stage>_ttft" record.
+    """
+
+    def __init__(self, log=None):
+        self.log = log or LatencyLog()
+        self._runs = {}  # run_id -> [stage, start, first token seen]
+
+    def _start(self, run_id, tags):
+        for tag in tags or ():
+            if tag.startswith(STAGE_TAG_PREFIX):
+                self._runs[run_id] = [tag[len(STAGE_TAG_PREFIX):], time.perf_counter(), False]
+                return
+
+    def _end(self, run_id):
+        run = self._runs.pop(run_id, None)
+        if run:
+            self.log.record(**{run[0]: time.perf_counter() - run[1]})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs):
+        self._start(run_id, tags)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        self._start(run_id, tags)
+
+    def on_retriever_start(self, serialized, query, *, run_id, tags=None, **kwargs):
+        self._start(run_id, tags)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run and not run[2]:
+            run[2] = True
+            self.log.record(**{f"{run[0]}_ttft": time.perf_counter() - run[1]})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
@@ -0,0 +1,237 @@
+import argparse
+import json
+import mmap
+import os
+import shutil
+import time
+import warnings
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from index_store import EMBED_MODEL, INDEX_DIR, index_fingerprint, load_index, make_embeddings, sync_index
+
+MMAP_DIR = os.getenv("EXCIUM_MMAP_DIR", "mmap_index")
+DTYPES = ("float32", "float16", "int8")
+EXPORT_BATCH = 4096
+# Rows scored per step. Each step converts its block to float32 (rows x dim x 4 bytes, ~6 MB at
+# 768 dims), so this bounds the private memory a query allocates on top of the shared mapping.
+SEARCH_BLOCK_ROWS = int(os.getenv("EXCIUM_MMAP_BLOCK_ROWS", "2048"))
+
+
+# ------------------ Export ------------------
+def export_index(vectorstore, out_dir, dtype="float16", batch=EXPORT_BATCH, index_dir=INDEX_DIR):
+    """Write the vector store's chunks to a flat .npy matrix plus an ID -> chunk side table.
+
+    Vectors are kept unnormalised with their squared norms, so search ranks by the same L2
+    distance Chroma uses. int8 rows are stored with a per-row scale. index_dir is where the
+    vector store is persisted; its manifest fingerprint is recorded as the export's version.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}")
+    out_dir = Path(out_dir)
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    count = vectorstore._collection.count()
+    if not count:
+        raise ValueError("The document index is empty; nothing to export.")
+    vectors = sqnorms = scales = None
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    with open(tmp / "chunks.jsonl", "wb") as side:
+        for start in range(0, count, batch):
+            rows = vectorstore.get(include=["embeddings", "documents", "metadatas"], limit=batch, offset=start)
+            block = np.asarray(rows["embeddings"], dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(tmp / "vectors.npy", mode="w+", dtype=dtype,
+                                                    shape=(count, block.shape[1]))
+                sqnorms = np.lib.format.open_memmap(tmp / "sqnorms.npy", mode="w+", dtype=np.float32, shape=(count,))
+                if dtype == "int8":
+                    scales = np.lib.format.open_memmap(tmp / "scales.npy", mode="w+", dtype=np.float32,
+                                                       shape=(count,))
+            end = start + len(block)
+            sqnorms[start:end] = np.einsum("ij,ij->i", block, block)
+            if dtype == "int8":
+                row_scale = np.maximum(np.abs(block).max(axis=1), 1e-12) / 127.0
+                vectors[start:end] = np.round(block / row_scale[:, None]).astype(np.int8)
+                scales[start:end] = row_scale
+            else:
+                vectors[start:end] = block.astype(dtype)
+
+            for i, (chunk_id, text, meta) in enumerate(zip(rows["ids"], rows["documents"], rows["metadatas"])):
+                line = json.dumps({"id": chunk_id, "text": text, "metadata": meta or {}}).encode("utf-8") + b"\n"
+                side.write(line)
+                offsets[start + i + 1] = offsets[start + i] + len(line)
+
+    for array in (vectors, sqnorms, scales):
+        if array is not None:
+            array.flush()
+    np.save(tmp / "offsets.npy", offsets)
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"dtype": dtype, "count": count, "dim": int(vectors.shape[1]),
+                   "model": EMBED_MODEL, "index_version": index_fingerprint(index_dir)}, f, indent=1)
+
+    # Swap the whole directory so readers never see a half-written export.
+    old = out_dir.with_name(out_dir.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if out_dir.exists():
+        os.replace(out_dir, old)
+    os.replace(tmp, out_dir)
+    shutil.rmtree(old, ignore_errors=True)
+    return out_dir
+
+
+# ------------------ Search ------------------
+class MmapIndex:
+    """Read-only, memory-mapped view of an export; every process maps the same page-cached files."""
+
+    def __init__(self, path):
+        self.path = path = Path(path)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.sqnorms = np.load(path / "sqnorms.npy", mmap_mode="r")
+        self.scales = np.load(path / "scales.npy", mmap_mode="r") if self.meta["dtype"] == "int8" else None
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        with open(path / "chunks.jsonl", "rb") as f:
+            self._chunks = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, queries, k=4, block_rows=SEARCH_BLOCK_ROWS):
+        """Batched exact top-k by L2 distance; returns (scores, indices), each shaped (n_queries, k)."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(self))
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self), block_rows):
+            end = min(start + block_rows, len(self))
+            # Ranking by x.q - |x|^2 / 2 is equivalent to ranking by -|x - q|^2.
+            scores = np.asarray(self.vectors[start:end], dtype=np.float32) @ queries.T
+            if self.scales is not None:
+                scores *= self.scales[start:end, None]
+            scores -= 0.5 * self.sqnorms[start:end, None]
+            scores = np.concatenate([best_scores, scores.T], axis=1)
+            ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, end), (len(queries), end - start))], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_ids = np.take_along_axis(ids, top, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+    def chunk(self, i):
+        return json.loads(self._chunks[self.offsets[i]:self.offsets[i + 1]])
+
+    def document(self, i):
+        row = self.chunk(i)
+        return Document(page_content=row["text"], metadata=row["metadata"])
+
+
+class MmapDocuments(Sequence):
+    """The export's chunks as Documents, read from the shared side table on each access."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.index.document(j) for j in range(*i.indices(len(self)))]
+        i = i + len(self) if i < 0 else i
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.index.document(i)
+
+
+class MmapVectorStore:
+    """The subset of the Chroma vector store API the retrievers use, backed by an MmapIndex."""
+
+    def __init__(self, index, embeddings):
+        self.index = index
+        self.embeddings = embeddings
+
+    def similarity_search(self, query, k=4):
+        _, ids = self.index.search(self.embeddings.embed_query(query), k)
+        return [self.index.document(int(i)) for i in ids[0]]
+
+    def lexical_documents(self):
+        # BM25 keeps only its postings per worker and reads chunk text from the mapping on demand.
+        return MmapDocuments(self.index)
+
+    def get(self, include=("documents", "metadatas")):
+        rows = [self.index.chunk(i) for i in range(len(self.index))]
+        return {"ids": [r["id"] for r in rows], "documents": [r["text"] for r in rows],
+                "metadatas": [r["metadata"] for r in rows]}
+
+
+def load_vectorstore(embeddings, mmap_dir=os.getenv("EXCIUM_MMAP_INDEX"), index_dir=INDEX_DIR):
+    """The shared mmap export when EXCIUM_MMAP_INDEX points at one, else the persisted Chroma index."""
+    if not mmap_dir:
+        return load_index(embeddings, index_dir=index_dir)
+    index = MmapIndex(mmap_dir)
+    if index.meta.get("index_version") != index_fingerprint(index_dir):
+        warnings.warn(f"{mmap_dir} was exported from an older document index; re-run the export.")
+    return MmapVectorStore(index, embeddings)
+
+
+def refresh_vectorstore(vectorstore, embeddings, index_dir=INDEX_DIR):
+    """Pick up data changes: sync a Chroma index in place, or re-map a (re-)exported mmap index."""
+    if isinstance(vectorstore, MmapVectorStore):
+        return load_vectorstore(embeddings, vectorstore.index.path, index_dir)
+    sync_index(vectorstore, index_dir=index_dir)
+    return vectorstore
+
+
+# ------------------ Recall report ------------------
+def recall_report(vectorstore, embeddings, out_root, dtypes, queries, k=4):
+    """Recall@k of each exported dtype against Chroma's own results for the same queries."""
+    vectors = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+    reference = vectorstore._collection.query(query_embeddings=vectors.tolist(), n_results=k, include=[])["ids"]
+    report = {"queries": len(queries), "k": k}
+    for dtype in dtypes:
+        index = MmapIndex(Path(out_root) / dtype)
+        start = time.perf_counter()
+        _, ids = index.search(vectors, k)
+        elapsed = time.perf_counter() - start
+        found = [[index.chunk(int(i))["id"] for i in row] for row in ids]
+        hits = sum(len(set(a) & set(b)) for a, b in zip(found, reference))
+        report[dtype] = {
+            f"recall@{k}": round(hits / max(sum(len(r) for r in reference), 1), 4),
+            "vectors_mb": round(index.vectors.nbytes / 2 ** 20, 2),
+            "search_ms_per_query": round(1000 * elapsed / max(len(queries), 1), 3),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the document index to shared memory-mapped arrays.")
+    parser.add_argument("command", choices=["export", "recall"])
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--out", default=MMAP_DIR, help="exports go to <out>/<dtype>")
+    parser.add_argument("--dtype", nargs="+", choices=DTYPES, default=list(DTYPES))
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=None, help="recall: use only the first N benchmark queries")
+    args = parser.parse_args(argv)
+
+    embeddings = make_embeddings()
+    vectorstore = load_index(embeddings, index_dir=args.index_dir)
+    if args.command == "export":
+        for dtype in args.dtype:
+            print(export_index(vectorstore, Path(args.out) / dtype, dtype, index_dir=args.index_dir))
+        return 0
+
+    from benchmark import query_corpus
+
+    queries = query_corpus(follow_up_every=0)[: args.limit]
+    print(json.dumps(recall_report(vectorstore, embeddings, args.out, args.dtype, queries, args.k), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
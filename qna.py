@@ -0,0 +1,34 @@
+import json
+import os
+
+QNA_FILE = os.getenv("EXCIUM_QNA_FILE", "data/qna.json")
+
+
+def normalize_question(text):
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+def load_qna(path=QNA_FILE):
+    """Predefined Q&A by sidebar category, as (question, answer) pairs."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {category: [(e["question"], e["answer"]) for e in entries] for category, entries in raw.items()}
+
+
+class QnaIndex:
+    """A loaded Q&A set with an exact-match lookup across every category; needs no models."""
+
+    def __init__(self, qna, hits=0):
+        self.qna = qna
+        self.hits = hits  # answered lookups; a reload passes the old count on
+        self.categories = list(qna)
+        self._exact = {}
+        for entries in qna.values():
+            for q, a in entries:
+                self._exact.setdefault(normalize_question(q), a)
+
+    def lookup(self, question):
+        answer = self._exact.get(normalize_question(question))
+        if answer is not None:
+            self.hits += 1
+        return answer
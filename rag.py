@@ -0,0 +1,63 @@
+import os
+
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+from memory import SessionMemoryStore, make_history_aware_retriever
+from metrics import stage_tag
+from retrieval import BM25Index, HybridRetriever
+
+LLM_MODEL = "llama-3.1-8b-instant"
+
+
+def make_llm():
+    # Imported here so offline benchmarks with a local stand-in don't need langchain_groq.
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model=LLM_MODEL)
+
+
+def build_chain(llm, vectorstore, summarizer=None, memory_store=None):
+    """Build the history-aware RAG chain; any chat model can stand in for ChatGroq.
+
+    Pass memory_store to keep conversations across rebuilds of the chain.
+    """
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=BM25Index.from_vectorstore(vectorstore))
+
+    contextual_prompt = ChatPromptTemplate.from_messages([
+        ("system", "Turn the latest user message into a standalone question."),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}")
+    ])
+    qa_prompt = ChatPromptTemplate.from_messages([
+        ("system", "Answer the question using this context: {context}"),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}")
+    ])
+
+    # Stage tags let metrics.StageTimer attribute time to each step from callbacks alone.
+    # Skips the rewrite LLM call when there is no history (and, with EXCIUM_REWRITE_MODE=auto,
+    # when the question already stands alone).
+    history_aware = make_history_aware_retriever(
+        llm.with_config(tags=[stage_tag("rewrite")]),
+        retriever.with_config(tags=[stage_tag("retrieve")]),
+        contextual_prompt,
+    )
+    qa_chain = create_stuff_documents_chain(llm.with_config(tags=[stage_tag("generate")]), qa_prompt)
+    rag_chain = create_retrieval_chain(history_aware, qa_chain)
+
+    if memory_store is None:
+        memory_store = SessionMemoryStore(summarizer=summarizer)
+    def get_history(session_id: str) -> BaseChatMessageHistory:
+        return memory_store.get(session_id)
+
+    return RunnableWithMessageHistory(
+        rag_chain,
+        get_history,
+        input_messages_key="input",
+        history_messages_key="chat_history",
+        output_messages_key="answer"
+    )
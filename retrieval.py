@@ -0,0 +1,137 @@
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from index_store import CHUNK_OVERLAP
+from memory import count_tokens
+
+RETRIEVAL_K = int(os.getenv("EXCIUM_RETRIEVAL_K", "8"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("EXCIUM_CONTEXT_TOKENS", "1200"))
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or our the to "
+    "what when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in _STOPWORDS]
+
+
+# ------------------ Lexical index ------------------
+class BM25Index:
+    """In-process Okapi BM25 over the same chunks stored in the vector index."""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(doc index, term frequency)]
+        self.lengths = []
+        for i, doc in enumerate(documents):
+            terms = Counter(tokenize(doc.page_content))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings[term].append((i, tf))
+        n = len(documents)
+        self.avg_length = sum(self.lengths) / n if n else 0.0
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        # Stores that can serve chunks lazily (the shared mmap export) avoid a per-process text copy.
+        lexical_documents = getattr(vectorstore, "lexical_documents", None)
+        if lexical_documents is not None:
+            return cls(lexical_documents())
+        stored = vectorstore.get(include=["documents", "metadatas"])
+        return cls([Document(page_content=text, metadata=meta or {})
+                    for text, meta in zip(stored["documents"], stored["metadatas"])])
+
+    def search(self, query, k):
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [self.documents[i] for i, _ in best]
+
+
+# ------------------ Fusion and packing ------------------
+def _key(doc):
+    return doc.metadata.get("source"), doc.page_content
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    scores, docs = defaultdict(float), {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = _key(doc)
+            scores[key] += 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def _overlap(head, tail, max_overlap=CHUNK_OVERLAP * 2, min_overlap=20):
+    """Length of the longest suffix of head that is a prefix of tail."""
+    for n in range(min(len(head), len(tail), max_overlap), min_overlap - 1, -1):
+        if head.endswith(tail[:n]):
+            return n
+    return 0
+
+
+def _similar(a, b, threshold=0.8):
+    a, b = set(tokenize(a)), set(tokenize(b))
+    return bool(a and b) and len(a & b) / len(a | b) >= threshold
+
+
+def pack_context(docs, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Merge overlapping neighbours, drop near-duplicates and keep docs until token_budget is used."""
+    packed, used = [], 0
+    for doc in docs:
+        text, source = doc.page_content, doc.metadata.get("source")
+        for i, kept in enumerate(packed):
+            if kept.metadata.get("source") != source:
+                continue
+            if (n := _overlap(kept.page_content, text)) or (m := _overlap(text, kept.page_content)):
+                merged = kept.page_content + text[n:] if n else text + kept.page_content[m:]
+                extra = count_tokens(merged) - count_tokens(kept.page_content)
+                if used + extra <= token_budget:
+                    packed[i] = Document(page_content=merged, metadata=kept.metadata)
+                    used += extra
+                break
+            if _similar(kept.page_content, text):
+                break
+        else:
+            cost = count_tokens(text)
+            if packed and used + cost > token_budget:
+                continue
+            packed.append(doc)
+            used += cost
+    return packed
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retrieval fused with reciprocal rank fusion, packed to a token budget."""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = RETRIEVAL_K
+    rrf_k: int = 60
+    token_budget: int = CONTEXT_TOKEN_BUDGET
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense = self.vectorstore.similarity_search(query, k=self.k)
+        lexical = self.bm25.search(query, self.k)
+        return pack_context(reciprocal_rank_fusion([dense, lexical], self.rrf_k), self.token_budget)
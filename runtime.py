@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from index_store import DATA_DIR, INDEX_DIR, load_manifest
+from memory import SessionMemoryStore, answer_is_shareable
+from qna import QNA_FILE, QnaIndex, load_qna
+
+RELOAD_INTERVAL = float(os.getenv("EXCIUM_RELOAD_INTERVAL", "5"))
+RELOAD_MAX_BACKOFF = float(os.getenv("EXCIUM_RELOAD_MAX_BACKOFF", "300"))
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def docs_signature(data_dir=DATA_DIR, mmap_dir=os.getenv("EXCIUM_MMAP_INDEX")):
+    paths = sorted(Path(data_dir).glob("**/*.docx"))
+    if mmap_dir:
+        paths.append(Path(mmap_dir) / "meta.json")
+    return tuple((p.as_posix(), _stat(p)) for p in paths)
+
+
+class Snapshot:
+    """The components one query uses; a reload builds a new snapshot instead of editing this one.
+
+    The one shared piece is a Chroma vector store, which a .docx change syncs in place (see
+    BotRuntime); an mmap export is re-mapped, so its snapshots share nothing mutable.
+    """
+
+    def __init__(self, chain, answer_cache, vectorstore):
+        self.chain = chain
+        self.answer_cache = answer_cache
+        self.vectorstore = vectorstore
+
+
+class BotRuntime:
+    """Loads the RAG components on a background thread and hot-reloads them when data/ changes.
+
+    The Q&A set is plain JSON and loads synchronously, so predefined questions are answered while
+    the embedding model and index are still loading. Readers take `runtime.snapshot` (and
+    `runtime.qna`) once per request; reloads build a new chain, BM25 index and answer cache off
+    to the side and swap the reference, so in-flight queries keep the ones they started with.
+
+    Chroma is the exception: re-embedding only the changed files means syncing the persisted
+    collection in place, so queries running during a .docx sync may see part of the change in
+    their dense results. Serve from an mmap export (EXCIUM_MMAP_INDEX) for fully isolated reloads.
+    A failed load or reload is retried with exponential backoff (up to RELOAD_MAX_BACKOFF seconds),
+    or at the next poll once data/ changes again. Documents that could not be parsed don't fail
+    a load; they are left out of the index and listed in `failed_files`.
+
+    Conversation memory lives here for the life of the process, so reloads keep conversations
+    and answers given without the chain (see lookup) still reach the session's history.
+    """
+
+    def __init__(self, load_bot=True, llm_factory=None, data_dir=DATA_DIR, qna_file=QNA_FILE,
+                 interval=RELOAD_INTERVAL, index_dir=INDEX_DIR):
+        self.load_bot = load_bot
+        self.llm_factory = llm_factory
+        self.data_dir = data_dir
+        self.index_dir = index_dir
+        self.qna_file = qna_file
+        self.interval = interval
+        self.qna = QnaIndex(load_qna(qna_file))
+        self.memory = SessionMemoryStore()
+        self.snapshot = None
+        self.error = None
+        self.failed_files = {}
+        self.reloads = 0
+        self._signature = (docs_signature(data_dir), _stat(qna_file))
+        self._failed_signature, self._failures, self._retry_at = None, 0, 0.0
+        self._embeddings = self._llm = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._run, name="excium-runtime", daemon=True).start()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def remember(self, session_id, question, answer):
+        """Record an exchange the chain did not run, so follow-ups see it as history."""
+        history = self.memory.get(session_id)
+        history.add_user_message(question)
+        history.add_ai_message(answer)
+
+    def lookup(self, session_id, question, snapshot=None):
+        """Answer without the LLM if possible; returns (answer or None, vector for answer_cache.add).
+
+        Exact predefined matches need no models; pass a snapshot to also search its answer cache.
+        Generated answers are keyed by question alone, so follow-ups neither read nor fill that
+        part (the vector comes back None). Any answer found is recorded in the session's memory.
+        """
+        answer, vector = self.qna.lookup(question), None
+        if answer is None and snapshot is not None:
+            shareable = answer_is_shareable(self.memory.get(session_id).messages, question)
+            answer, vector = snapshot.answer_cache.match(question, generated=shareable)
+            if not shareable:
+                vector = None
+        if answer is not None:
+            self.remember(session_id, question, answer)
+        return answer, vector
+
+    def _run(self):
+        while True:
+            try:
+                self._poll()
+            except Exception as exc:
+                self.error = exc
+            # Set after the first attempt, failed or not, so waiting requests can report the error.
+            self._ready.set()
+            time.sleep(self.interval)
+
+    def _poll(self):
+        docs, qna_stat = signature = (docs_signature(self.data_dir), _stat(self.qna_file))
+        first_load = self.load_bot and self.snapshot is None
+        if signature == self._signature and not first_load:
+            return
+        if signature == self._failed_signature and time.monotonic() < self._retry_at:
+            return  # same inputs failed last time; wait out the backoff unless data/ changes again
+        try:
+            qna = QnaIndex(load_qna(self.qna_file), self.qna.hits) if qna_stat != self._signature[1] else self.qna
+            if self.load_bot:
+                self.snapshot = self._build(qna, self.snapshot, docs != self._signature[0])
+                self.failed_files = {rel: entry["error"]
+                                     for rel, entry in load_manifest(self.index_dir).get("failed", {}).items()}
+        except Exception:
+            self._failures = self._failures + 1 if signature == self._failed_signature else 1
+            self._failed_signature = signature
+            self._retry_at = time.monotonic() + min(self.interval * 2 ** self._failures, RELOAD_MAX_BACKOFF)
+            raise
+        # Recorded only once the build succeeded, so a failed reload is retried.
+        self.qna, self._signature, self.error = qna, signature, None
+        self._failed_signature, self._failures = None, 0
+        if not first_load:
+            self.reloads += 1
+
+    def _build(self, qna, previous=None, docs_changed=True):
+        # Heavy imports live here so importing this module (and app.py) stays cheap.
+        from answer_cache import SemanticAnswerCache
+        from index_store import make_embeddings
+        from mmap_index import load_vectorstore, refresh_vectorstore
+        from rag import build_chain, make_llm
+
+        if self._llm is None:
+            # Assigned together, so a failure part way (e.g. a model download) is retried in full.
+            embeddings, llm = make_embeddings(), (self.llm_factory or make_llm)()
+            self._embeddings, self._llm = embeddings, llm
+            if os.getenv("EXCIUM_HISTORY_SUMMARY") == "1":
+                self.memory.summarizer = llm  # sessions started while loading keep plain trimming
+
+        answer_cache = SemanticAnswerCache(self._embeddings)
+        answer_cache.add_predefined(qna)
+        if previous is not None:
+            answer_cache.inherit_stats(previous.answer_cache)
+        if previous is not None and not docs_changed:
+            return Snapshot(previous.chain, answer_cache, previous.vectorstore)
+
+        if previous is None:
+            vectorstore = load_vectorstore(self._embeddings)
+        else:
+            # Chroma is synced in place (only changed files are re-embedded); an mmap export is re-mapped.
+            vectorstore = refresh_vectorstore(previous.vectorstore, self._embeddings)
+        chain = build_chain(self._llm, vectorstore, memory_store=self.memory)
+        return Snapshot(chain, answer_cache, vectorstore)
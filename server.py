@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from metrics import LatencyLog, StageTimer
+from qna import normalize_question
+from runtime import BotRuntime
+
+MAX_CONCURRENCY = int(os.getenv("EXCIUM_MAX_CONCURRENCY", "16"))
+MAX_QUEUE = int(os.getenv("EXCIUM_MAX_QUEUE", "64"))
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRequest(BaseModel):
+    session_id: str
+    input: str
+
+
+class QueueFull(Exception):
+    pass
+
+
+class GenerationFailed(Exception):
+    pass
+
+
+class InFlight:
+    """One answer being generated, replayed token by token to every request that joined it."""
+
+    def __init__(self, tokens=()):
+        self.tokens = list(tokens)
+        self.done = bool(tokens)
+        self.error = None
+        self.changed = asyncio.Condition()
+
+    @property
+    def text(self):
+        return "".join(self.tokens)
+
+    async def push(self, token):
+        async with self.changed:
+            self.tokens.append(token)
+            self.changed.notify_all()
+
+    async def finish(self, error=None):
+        async with self.changed:
+            self.done, self.error = True, error
+            self.changed.notify_all()
+
+    async def follow(self):
+        sent = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(self.tokens) > sent or self.done)
+                fresh, done = self.tokens[sent:], self.done
+            sent += len(fresh)
+            for token in fresh:
+                yield token
+            if done:
+                if self.error is not None:
+                    raise GenerationFailed("The answer could not be generated, please try again.") from self.error
+                return
+
+
+class ChatService:
+    """Serves the RAG chain with bounded concurrency, a bounded wait queue and request coalescing.
+
+    Identical questions from sessions with the same history share one in-flight LLM call. Each
+    request reads the runtime's current snapshot once, so hot reloads never block it.
+    """
+
+    def __init__(self, runtime, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE):
+        self.runtime = runtime
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.inflight = {}
+        self.coalesced = 0
+        self._tasks = set()  # strong references, so background tasks are not garbage-collected mid-run
+        self.latency_log = LatencyLog()
+        self.stage_timer = StageTimer()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _key(self, history, question):
+        digest = hashlib.sha256("\0".join(m.content for m in history).encode("utf-8")).hexdigest()
+        return normalize_question(question), digest
+
+    async def submit(self, session_id, question):
+        """Return the InFlight answering question, joining an identical one if possible."""
+        predefined, _ = self.runtime.lookup(session_id, question)
+        if predefined is not None:
+            return InFlight([predefined])
+        if not self.runtime.ready:
+            await asyncio.to_thread(self.runtime.wait_ready)
+        snapshot = self.runtime.snapshot
+        if snapshot is None:
+            raise RuntimeError(f"The assistant could not be loaded: {self.runtime.error}")
+
+        cached, vector = await asyncio.to_thread(self.runtime.lookup, session_id, question, snapshot)
+        if cached is not None:
+            return InFlight([cached])
+
+        key = self._key(self.runtime.memory.get(session_id).messages, question)
+        if key in self.inflight:
+            self.coalesced += 1
+            flight = self.inflight[key]
+            self._spawn(self._remember(session_id, question, flight))
+            return flight
+        if self.waiting >= self.max_queue:
+            raise QueueFull()
+
+        flight = self.inflight[key] = InFlight()
+        self.waiting += 1
+        self._spawn(self._generate(snapshot, key, session_id, question, vector, flight))
+        return flight
+
+    async def _generate(self, snapshot, key, session_id, question, vector, flight):
+        try:
+            try:
+                await self.semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            try:
+                start, ttft = time.perf_counter(), None
+                async for chunk in snapshot.chain.astream(
+                    {"input": question},
+                    config={"configurable": {"session_id": session_id}, "callbacks": [self.stage_timer]},
+                ):
+                    if chunk.get("answer"):
+                        ttft = ttft if ttft is not None else time.perf_counter() - start
+                        await flight.push(chunk["answer"])
+                total = time.perf_counter() - start
+                self.latency_log.record(ttft=ttft if ttft is not None else total, total=total)
+            finally:
+                self.semaphore.release()
+            await flight.finish()
+            if flight.text:
+                snapshot.answer_cache.add(vector, flight.text)
+        except asyncio.CancelledError as exc:
+            # Release every request that joined this answer before propagating the cancellation.
+            await flight.finish(exc)
+            raise
+        except Exception as exc:
+            logger.exception("Answer generation failed for session %s", session_id)
+            await flight.finish(exc)
+        finally:
+            self.inflight.pop(key, None)
+
+    async def _remember(self, session_id, question, flight):
+        # The chain only records history for the session that ran it; joined sessions get theirs here.
+        try:
+            async for _ in flight.follow():
+                pass
+        except GenerationFailed:
+            return
+        if flight.text:
+            self.runtime.remember(session_id, question, flight.text)
+
+    def stats(self):
+        return {
+            "waiting": self.waiting,
+            "in_flight": len(self.inflight),
+            "coalesced": self.coalesced,
+            "latency": self.latency_log.summary(),
+            "stages": self.stage_timer.log.summary(),
+            "ready": self.runtime.ready,
+            "reloads": self.runtime.reloads,
+            "load_error": str(self.runtime.error) if self.runtime.error else None,
+            "failed_files": self.runtime.failed_files,
+            "answer_cache": self.runtime.snapshot.answer_cache.stats() if self.runtime.snapshot else None,
+        }
+
+
+def local_llm():
+    from benchmark import LocalChatModel
+
+    return LocalChatModel()
+
+
+def create_service():
+    # The runtime creates one LLM client per worker process and reuses it across reloads, so the
+    # Groq SDK's pooled HTTP connections are shared by every request in the worker.
+    llm_factory = local_llm if os.getenv("EXCIUM_LLM") == "local" else None
+    return ChatService(BotRuntime(llm_factory=llm_factory))
+
+
+# ------------------ HTTP API ------------------
+@asynccontextmanager
+async def lifespan(app):
+    load_dotenv()
+    # Returns before the models are loaded; requests needing them wait on the runtime.
+    app.state.service = create_service()
+    yield
+
+
+app = FastAPI(title="ExciumEdu", lifespan=lifespan)
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest):
+    """Stream the answer as plain text chunks.
+
+    Failures before the first token return 502; a failure mid-answer aborts the stream.
+    """
+    try:
+        flight = await app.state.service.submit(request.session_id, request.input)
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Too many queued requests, try again shortly.")
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
+    tokens = flight.follow()
+    try:
+        first = await anext(tokens, "")
+    except GenerationFailed as exc:
+        raise HTTPException(status_code=502, detail=str(exc))
+
+    async def body():
+        yield first
+        async for token in tokens:
+            yield token
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
+
+
+@app.get("/metrics")
+async def metrics():
+    return app.state.service.stats()
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    workers = int(os.getenv("EXCIUM_WORKERS", "1"))
+    # Each worker loads its own runtime. Only an mmap export can be shared read-only; a Chroma
+    # index may have a single process (which also syncs it) attached.
+    if workers > 1 and not os.getenv("EXCIUM_MMAP_INDEX"):
+        raise SystemExit("EXCIUM_WORKERS > 1 needs EXCIUM_MMAP_INDEX: sync and export the index with "
+                         "index_store.py / mmap_index.py, then serve the export from every worker.")
+    uvicorn.run("server:app", host=os.getenv("EXCIUM_HOST", "0.0.0.0"), port=int(os.getenv("EXCIUM_PORT", "8000")),
+                workers=workers)
@@ -0,0 +1,92 @@
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ingest  # noqa: E402
+
+
+class StubEmbeddings:
+    """Deterministic hash-seeded vectors; counts how many texts were embedded."""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.embedded = 0
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32).tolist()
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [self.embed_query(t) for t in texts]
+
+
+class FakeVectorStore:
+    """The slice of the Chroma vector store API that the index, ingest, mmap and retrieval code use."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self._collection = self
+        self.rows = {}  # id -> (embedding, document, metadata)
+        self.persisted = 0
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for row in zip(ids, embeddings, documents, metadatas):
+            self.rows[row[0]] = row[1:]
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+    def persist(self):
+        self.persisted += 1
+
+    def count(self):
+        return len(self.rows)
+
+    def similarity_search(self, query, k=4):
+        ids = sorted(self.rows)
+        if not ids:
+            return []
+        stored = np.asarray([self.rows[i][0] for i in ids], dtype=np.float32)
+        distances = ((stored - np.asarray(self.embeddings.embed_query(query), dtype=np.float32)) ** 2).sum(axis=1)
+        return [Document(page_content=self.rows[ids[j]][1], metadata=self.rows[ids[j]][2] or {})
+                for j in np.argsort(distances)[:k]]
+
+    def get(self, include=("documents", "metadatas"), limit=None, offset=0):
+        ids = sorted(self.rows)[offset:None if limit is None else offset + limit]
+        result = {"ids": ids}
+        for position, field in enumerate(("embeddings", "documents", "metadatas")):
+            if field in include:
+                result[field] = [self.rows[i][position] for i in ids]
+        return result
+
+
+def split_text_file(path):
+    # Test "documents" are plain text; each blank-line separated paragraph is one chunk.
+    text = Path(path).read_text(encoding="utf-8")
+    if text.startswith("CORRUPT"):
+        raise ValueError(f"cannot read {Path(path).name}")
+    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+    return [Document(page_content=p, metadata={"source": str(path)}) for p in paragraphs]
+
+
+@pytest.fixture
+def embeddings():
+    return StubEmbeddings()
+
+
+@pytest.fixture
+def vectorstore(embeddings):
+    return FakeVectorStore(embeddings)
+
+
+@pytest.fixture
+def text_parser(monkeypatch):
+    monkeypatch.setattr(ingest, "_split_file", split_text_file)
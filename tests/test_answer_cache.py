@@ -0,0 +1,101 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from answer_cache import SemanticAnswerCache
+from memory import answer_is_shareable, is_standalone
+from qna import QnaIndex
+
+QNA = {"Fees": [("What is the tuition fee?", "It is 100.")]}
+
+
+@pytest.fixture
+def cache(embeddings):
+    cache = SemanticAnswerCache(embeddings, threshold=0.99, max_entries=2, ttl=60)
+    cache.add_predefined(QnaIndex(QNA))
+    return cache
+
+
+def test_exact_hits_are_answered_by_the_qna_index_and_counted(cache, embeddings):
+    embedded = embeddings.embedded
+
+    assert cache.qna.lookup("  what is the TUITION fee ") == "It is 100."
+    assert cache.match("What is the tuition fee?")[0] == "It is 100."
+    cache.match("Where is the campus?")
+
+    stats = cache.stats()
+    assert (stats["exact"], stats["predefined"], stats["misses"], stats["hit_rate"]) == (1, 1, 1, 0.667)
+    assert embeddings.embedded == embedded
+
+
+def test_stats_survive_a_rebuilt_cache(cache, embeddings):
+    cache.match("What is the tuition fee?")
+    rebuilt = SemanticAnswerCache(embeddings)
+    rebuilt.add_predefined(cache.qna)
+
+    rebuilt.inherit_stats(cache)
+
+    assert rebuilt.stats()["predefined"] == 1
+
+
+def test_generated_answers_round_trip(cache):
+    answer, vector = cache.match("Where is the campus?")
+    assert answer is None
+    cache.add(vector, "In town.")
+
+    assert cache.match("Where is the campus?")[0] == "In town."
+    assert cache.stats()["generated"] == 1
+
+
+def test_history_dependent_lookups_skip_generated_answers(cache):
+    _, vector = cache.match("How much does that cost?")
+    cache.add(vector, "It costs 100.")
+
+    assert cache.match("How much does that cost?", generated=False)[0] is None
+    assert cache.match("How much does that cost?")[0] == "It costs 100."
+
+
+def test_least_recently_used_answer_is_evicted(cache):
+    for question in ("one question", "two question"):
+        cache.add(cache.match(question)[1], question.upper())
+    cache.match("one question")  # refresh, so "two question" is now least recently used
+
+    cache.add(cache.match("three question")[1], "THREE QUESTION")
+
+    assert cache.match("one question")[0] == "ONE QUESTION"
+    assert cache.match("two question")[0] is None
+    assert cache.match("three question")[0] == "THREE QUESTION"
+    assert cache.stats()["generated_entries"] == 2
+
+
+def test_expired_answers_are_removed(embeddings, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("answer_cache.time.monotonic", lambda: clock[0])
+    cache = SemanticAnswerCache(embeddings, threshold=0.99, max_entries=2, ttl=10)
+    for question in ("one question", "two question"):
+        cache.add(cache.match(question)[1], question.upper())
+    clock[0] += 5
+    cache.match("two question")  # recently used, but expiry is by age
+
+    clock[0] += 6
+    assert cache.stats()["generated_entries"] == 0
+    assert cache.match("one question")[0] is None
+
+    # Freed slots are reused before any live entry is evicted.
+    cache.add(cache.match("three question")[1], "THREE")
+    cache.add(cache.match("four question")[1], "FOUR")
+    assert cache.match("three question")[0] == "THREE" and cache.match("four question")[0] == "FOUR"
+
+
+def test_add_without_vector_is_ignored(cache):
+    cache.add(None, "anything")
+
+    assert cache.stats()["generated_entries"] == 0
+
+
+def test_only_history_free_or_standalone_answers_are_shareable():
+    history = [HumanMessage(content="Tell me about the MBA."), AIMessage(content="It is two years.")]
+
+    assert answer_is_shareable([], "How much does that cost?")
+    assert not answer_is_shareable(history, "How much does that cost?")
+    assert answer_is_shareable(history, "What is the tuition fee for the MBA program?")
+    assert not is_standalone("And the deadline?")
@@ -0,0 +1,177 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from index_store import load_manifest, lock_index, sync_index, verify_index
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    data, index = tmp_path / "data", tmp_path / "index"
+    data.mkdir()
+    return data, index
+
+
+def write(path, *paragraphs):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+
+def sync(vectorstore, data, index):
+    return sync_index(vectorstore, data, index, workers=1)
+
+
+def test_initial_sync_indexes_every_chunk(vectorstore, embeddings, dirs, text_parser):
+    data, index = dirs
+    write(data / "fees.docx", "Tuition is 100.", "Housing is 50.")
+    write(data / "sub" / "dates.docx", "Term starts in May.")
+
+    stats = sync(vectorstore, data, index)
+
+    assert (stats["added"], stats["chunks_embedded"]) == (2, 3)
+    assert embeddings.embedded == 3 and vectorstore.count() == 3
+    assert set(load_manifest(index)["files"]) == {"fees.docx", "sub/dates.docx"}
+    assert verify_index(vectorstore, data, index) == []
+
+
+def test_unchanged_files_are_not_reparsed(vectorstore, embeddings, dirs, text_parser):
+    data, index = dirs
+    write(data / "fees.docx", "Tuition is 100.")
+    sync(vectorstore, data, index)
+    persisted = vectorstore.persisted
+
+    stats = sync(vectorstore, data, index)
+
+    assert stats["unchanged"] == 1 and stats["chunks_embedded"] == 0
+    assert embeddings.embedded == 1 and vectorstore.persisted == persisted
+
+
+def test_edit_reembeds_only_changed_chunks(vectorstore, embeddings, dirs, text_parser):
+    data, index = dirs
+    write(data / "fees.docx", "Tuition is 100.", "Housing is 50.", "Books are 20.")
+    sync(vectorstore, data, index)
+    before = set(vectorstore.rows)
+
+    write(data / "fees.docx", "Tuition is 100.", "Housing is 75.", "Books are 20.")
+    stats = sync(vectorstore, data, index)
+
+    assert (stats["changed"], stats["chunks_embedded"], stats["chunks_deleted"]) == (1, 1, 1)
+    assert embeddings.embedded == 4
+    assert len(before & set(vectorstore.rows)) == 2
+    assert sorted(doc for _, doc, _ in vectorstore.rows.values()) == ["Books are 20.", "Housing is 75.",
+                                                                     "Tuition is 100."]
+    assert verify_index(vectorstore, data, index) == []
+
+
+def test_duplicate_chunks_get_distinct_ids(vectorstore, dirs, text_parser):
+    data, index = dirs
+    write(data / "faq.docx", "Ask the office.", "Ask the office.")
+
+    sync(vectorstore, data, index)
+
+    assert vectorstore.count() == 2
+    assert verify_index(vectorstore, data, index) == []
+
+
+def test_deleted_file_removes_its_chunks(vectorstore, dirs, text_parser):
+    data, index = dirs
+    write(data / "fees.docx", "Tuition is 100.", "Housing is 50.")
+    write(data / "dates.docx", "Term starts in May.")
+    sync(vectorstore, data, index)
+
+    (data / "fees.docx").unlink()
+    stats = sync(vectorstore, data, index)
+
+    assert (stats["removed"], stats["chunks_deleted"]) == (1, 2)
+    assert [doc for _, doc, _ in vectorstore.rows.values()] == ["Term starts in May."]
+    assert set(load_manifest(index)["files"]) == {"dates.docx"}
+    assert verify_index(vectorstore, data, index) == []
+
+
+def test_verify_reports_drift(vectorstore, dirs, text_parser):
+    data, index = dirs
+    write(data / "fees.docx", "Tuition is 100.")
+    write(data / "dates.docx", "Term starts in May.")
+    sync(vectorstore, data, index)
+
+    write(data / "fees.docx", "Tuition is 120.")
+    (data / "dates.docx").unlink()
+    write(data / "new.docx", "Scholarships exist.")
+    vectorstore.upsert(["orphan"], [[0.0] * 16], ["stray"], [{}])
+
+    problems = verify_index(vectorstore, data, index)
+
+    assert "stale: fees.docx" in problems
+    assert "indexed but missing on disk: dates.docx" in problems
+    assert "not indexed: new.docx" in problems
+    assert "1 orphan chunk(s) in the vector store" in problems
+
+
+def test_settings_change_requires_rebuild(vectorstore, dirs, text_parser, monkeypatch):
+    data, index = dirs
+    write(data / "fees.docx", "Tuition is 100.")
+    sync(vectorstore, data, index)
+
+    monkeypatch.setattr("index_store.CHUNK_SIZE", 500)
+
+    with pytest.raises(RuntimeError, match="rebuild"):
+        sync(vectorstore, data, index)
+
+
+def test_unparseable_file_is_skipped_and_reported(vectorstore, embeddings, dirs, text_parser, monkeypatch):
+    data, index = dirs
+    write(data / "fees.docx", "Tuition is 100.")
+    write(data / "bad.docx", "CORRUPT")
+    write(data / "dates.docx", "Term starts in May.")
+
+    stats = sync(vectorstore, data, index)
+
+    assert stats["added"] == 2 and vectorstore.count() == 2
+    assert stats["failed"] == {"bad.docx": "ValueError: cannot read bad.docx"}
+    assert set(load_manifest(index)["files"]) == {"fees.docx", "dates.docx"}
+    assert verify_index(vectorstore, data, index) == ["failed to parse: bad.docx (ValueError: cannot read bad.docx)"]
+
+    # Not retried until its contents change.
+    parsed = []
+    monkeypatch.setattr("ingest._split_file", lambda path: parsed.append(path) or [])
+    assert sync(vectorstore, data, index)["failed"] == {"bad.docx": "ValueError: cannot read bad.docx"}
+    assert parsed == []
+
+
+def test_fixed_file_is_indexed_and_cleared_from_failures(vectorstore, dirs, text_parser):
+    data, index = dirs
+    write(data / "bad.docx", "CORRUPT")
+    sync(vectorstore, data, index)
+
+    write(data / "bad.docx", "Now readable.")
+    stats = sync(vectorstore, data, index)
+
+    assert stats["added"] == 1 and stats["failed"] == {}
+    assert verify_index(vectorstore, data, index) == []
+
+
+def test_failed_edit_keeps_the_previous_version(vectorstore, dirs, text_parser):
+    data, index = dirs
+    write(data / "fees.docx", "Tuition is 100.")
+    sync(vectorstore, data, index)
+
+    write(data / "fees.docx", "CORRUPT")
+    stats = sync(vectorstore, data, index)
+
+    assert list(stats["failed"]) == ["fees.docx"]
+    assert [doc for _, doc, _ in vectorstore.rows.values()] == ["Tuition is 100."]
+
+
+def test_only_one_process_may_attach_to_an_index(tmp_path):
+    index = tmp_path / "index"
+    lock_index(index)
+    lock_index(index)  # re-entrant within a process
+
+    other = subprocess.run(
+        [sys.executable, "-c", f"import index_store; index_store.lock_index({str(index)!r})"],
+        cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True,
+    )
+
+    assert other.returncode != 0 and "in use by another process" in other.stderr
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from index_store import chunk_ids
+from ingest import IngestPipeline
+
+
+def write_files(tmp_path, texts):
+    files = []
+    for i, text in enumerate(texts):
+        path = tmp_path / f"doc{i}.docx"
+        path.write_text(text, encoding="utf-8")
+        files.append((path.name, path))
+    return files
+
+
+def embed_all(rel, chunks):
+    return list(zip(chunk_ids(rel, chunks), chunks))
+
+
+class BlockingEmbeddings:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.release = threading.Event()
+
+    def embed_documents(self, texts):
+        self.release.wait(5)
+        return self.embeddings.embed_documents(texts)
+
+
+def test_every_chunk_is_written_in_batches(vectorstore, tmp_path, text_parser):
+    files = write_files(tmp_path, ["a\n\nb\n\nc", "d\n\ne"])
+
+    report = IngestPipeline(vectorstore, 100, 10, workers=1, batch_size=2).run(files, embed_all)
+
+    assert (report["files"], report["chunks"], report["embeddings"]) == (2, 5, 5)
+    assert sorted(doc for _, doc, _ in vectorstore.rows.values()) == list("abcde")
+
+
+def test_parser_blocks_while_the_writer_is_behind(vectorstore, embeddings, tmp_path, text_parser):
+    files = write_files(tmp_path, [f"chunk {i}" for i in range(10)])
+    vectorstore.embeddings = BlockingEmbeddings(embeddings)
+    parsed = []
+
+    def on_file(rel, chunks):
+        parsed.append(rel)
+        return embed_all(rel, chunks)
+
+    pipeline = IngestPipeline(vectorstore, 100, 10, workers=1, batch_size=1, queued_batches=1)
+    run = threading.Thread(target=pipeline.run, args=(files, on_file))
+    run.start()
+    time.sleep(0.2)
+    # One batch in the writer, one in the queue, one waiting to be queued.
+    assert len(parsed) <= 3
+
+    vectorstore.embeddings.release.set()
+    run.join(5)
+    assert len(parsed) == 10 and vectorstore.count() == 10
+
+
+def test_writer_errors_abort_the_run(vectorstore, tmp_path, text_parser):
+    files = write_files(tmp_path, [f"chunk {i}" for i in range(10)])
+
+    class FailingCollection:
+        def upsert(self, **_):
+            raise OSError("disk full")
+
+    vectorstore._collection = FailingCollection()
+
+    with pytest.raises(OSError, match="disk full"):
+        IngestPipeline(vectorstore, 100, 10, workers=1, batch_size=1).run(files, embed_all)
+
+
+def test_unparseable_files_are_skipped_and_reported(vectorstore, tmp_path, text_parser):
+    files = write_files(tmp_path, ["a", "CORRUPT", "b"])
+    errors = []
+
+    report = IngestPipeline(vectorstore, 100, 10, workers=1).run(
+        files, embed_all, lambda rel, error: errors.append((rel, error)))
+
+    assert errors == [("doc1.docx", "ValueError: cannot read doc1.docx")]
+    assert report["failed"] == {"doc1.docx": "ValueError: cannot read doc1.docx"}
+    assert report["files"] == 2 and vectorstore.count() == 2
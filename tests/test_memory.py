@@ -0,0 +1,63 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from memory import SessionMemoryStore, WindowedChatHistory
+
+
+class StubSummarizer:
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return AIMessage(content=f"summary {len(self.prompts)}")
+
+
+def test_window_drops_oldest_messages_past_budget():
+    history = WindowedChatHistory(token_budget=10)
+    for i in range(4):
+        history.add_user_message(f"question {i} " * 3)
+
+    assert [m.content for m in history.messages] == [f"question {i} " * 3 for i in (2, 3)]
+
+
+def test_window_keeps_latest_exchange_over_budget():
+    history = WindowedChatHistory(token_budget=1)
+    history.add_user_message("a long question " * 10)
+    history.add_ai_message("a long answer " * 10)
+
+    assert len(history.messages) == 2
+
+
+def test_dropped_messages_are_summarized():
+    summarizer = StubSummarizer()
+    history = WindowedChatHistory(token_budget=10, summarizer=summarizer)
+    for i in range(3):
+        history.add_message(HumanMessage(content=f"question {i} " * 3))
+
+    first = history.messages[0]
+    assert isinstance(first, SystemMessage) and "summary 1" in first.content
+    assert "question 0" in summarizer.prompts[0]
+
+    history.clear()
+    assert history.messages == []
+
+
+def test_store_evicts_least_recently_used_session():
+    store = SessionMemoryStore(max_sessions=2)
+    a = store.get("a")
+    store.get("b")
+    assert store.get("a") is a  # "b" is now least recently used
+
+    store.get("c")
+
+    assert len(store) == 2
+    assert store.get("a") is a
+    assert store.get("b").messages == []
+
+
+def test_store_expires_idle_sessions():
+    store = SessionMemoryStore(idle_ttl=0)
+    store.get("a").add_user_message("hello")
+
+    assert store.get("a").messages == []
+
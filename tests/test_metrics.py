@@ -0,0 +1,123 @@
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+from benchmark import LocalChatModel, main, query_corpus, run_load
+from index_store import MANIFEST_FILE, load_manifest, save_manifest
+from metrics import LatencyLog, StageTimer, percentile, stage_tag, timed_stream
+from rag import build_chain
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+
+    assert [percentile(values, p) for p in (0, 50, 95, 99, 100)] == [1, 51, 95, 99, 100]
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_latency_log_keeps_the_most_recent_records():
+    log = LatencyLog(maxlen=3)
+    for i in range(5):
+        log.record(total=float(i))
+
+    assert log.last() == {"total": 4.0}
+    assert log.summary() == {"total": {"p50": 3.0, "p95": 4.0, "p99": 4.0}}
+
+
+def test_latency_log_summarizes_each_field_separately():
+    log = LatencyLog(maxlen=None)
+    log.record(ttft=1.0, total=2.0)
+    log.record(total=4.0)
+
+    assert log.summary(pcts=(100,)) == {"total": {"p100": 4.0}, "ttft": {"p100": 1.0}}
+    assert LatencyLog().last() is None
+
+
+def slow_tokens(first_delay, tokens):
+    time.sleep(first_delay)
+    for token in tokens:
+        yield token
+        time.sleep(0.01)
+
+
+def test_timed_stream_records_first_token_and_total():
+    log = LatencyLog()
+
+    assert list(timed_stream(slow_tokens(0.05, ["", "a", "b"]), log, session="s")) == ["", "a", "b"]
+
+    record = log.last()
+    assert record["session"] == "s"
+    # Empty chunks do not count as the first token.
+    assert 0.05 <= record["ttft"] < record["total"]
+    assert record["total"] >= 0.08
+
+
+def test_timed_stream_without_tokens_uses_total_as_ttft():
+    log = LatencyLog()
+
+    assert list(timed_stream(iter(()), log)) == []
+    assert log.last()["ttft"] == log.last()["total"]
+
+
+# ------------------ Stage timing ------------------
+@pytest.fixture
+def chain(vectorstore, embeddings):
+    texts = ["Tuition is 100 per term.", "Housing costs 50 per month.", "Term starts in May."]
+    vectorstore.upsert(texts, embeddings.embed_documents(texts), texts, [{"source": "a.docx"}] * 3)
+    return build_chain(LocalChatModel(first_token_delay=0.01, token_delay=0.0), vectorstore)
+
+
+def test_stage_timer_times_each_tagged_stage(chain):
+    timer = StageTimer(LatencyLog(maxlen=None))
+    config = {"configurable": {"session_id": "s"}, "callbacks": [timer]}
+
+    list(chain.stream({"input": "What is the tuition fee?"}, config=config))
+    assert set(timer.log.summary()) == {"retrieve", "generate", "generate_ttft"}
+
+    list(chain.stream({"input": "How much does that cost?"}, config=config))
+    summary = timer.log.summary()
+    assert set(summary) == {"rewrite", "rewrite_ttft", "retrieve", "generate", "generate_ttft"}
+    assert summary["generate_ttft"]["p50"] <= summary["generate"]["p50"]
+
+
+def test_stage_timer_ignores_untagged_and_failed_runs():
+    timer = StageTimer()
+    untagged, failed = uuid.uuid4(), uuid.uuid4()
+
+    timer.on_llm_start({}, ["p"], run_id=untagged, tags=["other"])
+    timer.on_llm_end(None, run_id=untagged)
+    timer.on_retriever_start({}, "q", run_id=failed, tags=[stage_tag("retrieve")])
+    timer.on_retriever_error(ValueError(), run_id=failed)
+    timer.on_retriever_end([], run_id=failed)
+
+    assert timer.log.summary() == {}
+
+
+def test_run_load_reports_every_query(chain):
+    queries = query_corpus({"Fees": [("What is the tuition fee?", "100")]}, follow_up_every=2)
+
+    report = run_load(chain, queries, sessions=2, tag="test")
+
+    assert report["queries"] == len(queries) == 9
+    assert set(report["end_to_end"]) == {"ttft", "total"}
+    assert {"retrieve", "generate"} <= set(report["stages"])
+
+
+def test_benchmark_opens_a_copy_of_the_index(tmp_path, vectorstore, embeddings, monkeypatch):
+    index_dir = tmp_path / "chroma_db"
+    save_manifest(load_manifest(index_dir), index_dir)
+    opened = []
+
+    def open_copy(_, path):
+        opened.append((path, (Path(path) / MANIFEST_FILE).exists()))
+        return vectorstore
+
+    monkeypatch.setattr("benchmark.make_embeddings", lambda: embeddings)
+    monkeypatch.setattr("benchmark.open_index", open_copy)
+    monkeypatch.setattr("benchmark.query_corpus", lambda: ["What is the tuition fee?"])
+
+    assert main(["--index-dir", str(index_dir), "--concurrency", "1", "--first-token-delay", "0"]) == 0
+    assert opened[0][0] != str(index_dir) and opened[0][1]
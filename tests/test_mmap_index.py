@@ -0,0 +1,88 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from index_store import load_manifest, save_manifest
+from mmap_index import DTYPES, MmapDocuments, MmapIndex, MmapVectorStore, export_index, load_vectorstore
+from retrieval import BM25Index
+
+
+@pytest.fixture
+def populated(vectorstore):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 16)).astype(np.float32) * rng.uniform(0.5, 2.0, (500, 1))
+    vectorstore.upsert([f"c{i:03d}" for i in range(500)], vectors.tolist(),
+                       [f"chunk {i}" for i in range(500)], [{"source": f"doc{i % 7}"} for i in range(500)])
+    return vectorstore
+
+
+def brute_force(vectorstore, queries, k):
+    stored = np.asarray(vectorstore.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+    distances = ((stored[None, :, :] - queries[:, None, :]) ** 2).sum(axis=2)
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+@pytest.mark.parametrize("dtype, min_recall", [("float32", 1.0), ("float16", 0.95), ("int8", 0.9)])
+def test_search_matches_brute_force_l2(populated, tmp_path, dtype, min_recall):
+    index = MmapIndex(export_index(populated, tmp_path / dtype, dtype, batch=128, index_dir=tmp_path))
+    queries = np.random.default_rng(1).standard_normal((20, 16)).astype(np.float32)
+
+    # Small blocks exercise the running top-k merge across blocks.
+    _, ids = index.search(queries, k=5, block_rows=64)
+
+    expected = brute_force(populated, queries, 5)
+    if dtype == "float32":
+        np.testing.assert_array_equal(ids, expected)
+    hits = sum(len(set(a) & set(b)) for a, b in zip(ids.tolist(), expected.tolist()))
+    assert hits / expected.size >= min_recall
+
+
+def test_rows_map_back_to_chunks(populated, tmp_path):
+    index = MmapIndex(export_index(populated, tmp_path / "float16", index_dir=tmp_path))
+    ids = populated.get(include=[])["ids"]
+
+    assert len(index) == 500
+    assert index.chunk(42) == {"id": ids[42], "text": "chunk 42", "metadata": {"source": "doc0"}}
+    store = MmapVectorStore(index, populated.embeddings)
+    assert store.get()["documents"][:2] == ["chunk 0", "chunk 1"]
+
+
+def test_empty_index_is_not_exported(vectorstore, tmp_path):
+    with pytest.raises(ValueError, match="empty"):
+        export_index(vectorstore, tmp_path / "float32", "float32")
+
+
+def test_load_warns_when_export_is_stale(populated, embeddings, tmp_path):
+    index_dir = tmp_path / "index"
+    save_manifest(load_manifest(index_dir), index_dir)
+    out = export_index(populated, tmp_path / "float32", "float32", index_dir=index_dir)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        load_vectorstore(embeddings, out, index_dir)
+
+    manifest = load_manifest(index_dir)
+    manifest["files"]["new.docx"] = {"sha256": "0", "chunks": []}
+    save_manifest(manifest, index_dir)
+    with pytest.warns(UserWarning, match="older document index"):
+        load_vectorstore(embeddings, out, index_dir)
+
+
+def test_dtypes_are_validated(populated, tmp_path):
+    assert "float64" not in DTYPES
+    with pytest.raises(ValueError):
+        export_index(populated, tmp_path / "x", "float64")
+
+
+def test_bm25_reads_chunks_from_the_mapping(populated, embeddings, tmp_path):
+    store = MmapVectorStore(MmapIndex(export_index(populated, tmp_path / "float16", index_dir=tmp_path)),
+                            embeddings)
+
+    bm25 = BM25Index.from_vectorstore(store)
+
+    assert isinstance(bm25.documents, MmapDocuments) and len(bm25.documents) == 500
+    assert [d.page_content for d in bm25.search("chunk 42", 1)] == ["chunk 42"]
+    assert bm25.documents[-1].page_content == "chunk 499" and len(bm25.documents[:3]) == 3
+    with pytest.raises(IndexError):
+        bm25.documents[500]
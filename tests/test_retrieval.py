@@ -0,0 +1,55 @@
+from langchain_core.documents import Document
+
+from retrieval import BM25Index, pack_context, reciprocal_rank_fusion
+
+
+def doc(text, source="a.docx"):
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_bm25_ranks_matching_documents_first():
+    docs = [doc("Tuition fees are paid each term."), doc("The library opens at nine."),
+            doc("Housing fees and tuition fees differ.")]
+    index = BM25Index(docs)
+
+    assert index.search("tuition fees", 2) == [docs[2], docs[0]]
+    assert index.search("unknown words", 2) == []
+
+
+def test_bm25_from_vectorstore(vectorstore):
+    vectorstore.upsert(["1", "2"], [[0.0], [0.0]], ["Scholarships for students.", "Visa help."],
+                       [{"source": "a"}, None])
+
+    assert [d.page_content for d in BM25Index.from_vectorstore(vectorstore).search("visa", 1)] == ["Visa help."]
+
+
+def test_rank_fusion_prefers_documents_in_both_rankings():
+    a, b, c = doc("alpha"), doc("beta"), doc("gamma")
+
+    assert reciprocal_rank_fusion([[a, b], [c, b]])[0] == b
+
+
+def test_pack_merges_overlapping_neighbours():
+    head = "Applications open in January. " + "Submit transcripts and two references online."
+    tail = "Submit transcripts and two references online." + " Decisions arrive in April."
+
+    packed = pack_context([doc(head), doc(tail)], token_budget=1000)
+
+    assert [d.page_content for d in packed] == [head + " Decisions arrive in April."]
+
+
+def test_pack_drops_near_duplicates_and_respects_budget():
+    first = doc("Tuition fees are paid each term by bank transfer.")
+    duplicate = doc("Tuition fees are paid each term, by bank transfer.")
+    other_source = doc("Tuition fees are paid each term by bank transfer.", source="b.docx")
+    too_long = doc("word " * 400, source="c.docx")
+
+    packed = pack_context([first, duplicate, other_source, too_long], token_budget=40)
+
+    assert packed == [first, other_source]
+
+
+def test_pack_keeps_first_document_even_over_budget():
+    big = doc("word " * 400)
+
+    assert pack_context([big], token_budget=10) == [big]
@@ -0,0 +1,159 @@
+import json
+
+import pytest
+
+from answer_cache import SemanticAnswerCache
+from benchmark import LocalChatModel
+from conftest import FakeVectorStore
+from index_store import save_manifest
+from runtime import BotRuntime, Snapshot
+
+QNA = {"Fees": [{"question": "What is the tuition fee?", "answer": "It is 100."}]}
+
+
+@pytest.fixture
+def qna_file(tmp_path):
+    path = tmp_path / "qna.json"
+    path.write_text(json.dumps(QNA), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def runtime(tmp_path, qna_file):
+    return BotRuntime(load_bot=False, data_dir=tmp_path, qna_file=qna_file, interval=3600)
+
+
+@pytest.fixture
+def snapshot(runtime, embeddings):
+    cache = SemanticAnswerCache(embeddings, threshold=0.99)
+    cache.add_predefined(runtime.qna)
+    return Snapshot(chain=None, answer_cache=cache, vectorstore=None)
+
+
+def test_lookup_records_predefined_answers_in_memory(runtime):
+    assert runtime.lookup("s", "what is the tuition fee") == ("It is 100.", None)
+
+    assert [m.content for m in runtime.memory.get("s").messages] == ["what is the tuition fee", "It is 100."]
+
+
+def test_cache_hit_then_follow_up_is_not_shared(runtime, snapshot):
+    # Another session's standalone question leaves a generated answer in the cache.
+    answer, vector = runtime.lookup("other", "How much does that cost?", snapshot)
+    assert answer is None and vector is not None
+    snapshot.answer_cache.add(vector, "The MBA costs 900.")
+
+    runtime.lookup("s", "What is the tuition fee?")
+    answer, vector = runtime.lookup("s", "How much does that cost?", snapshot)
+
+    assert answer is None and vector is None
+    assert len(runtime.memory.get("s").messages) == 2
+
+
+def test_semantic_cache_hits_are_recorded_in_memory(runtime, snapshot):
+    _, vector = runtime.lookup("a", "Where is the main campus?", snapshot)
+    snapshot.answer_cache.add(vector, "In town.")
+
+    assert runtime.lookup("b", "Where is the main campus?", snapshot)[0] == "In town."
+    assert [m.content for m in runtime.memory.get("b").messages] == ["Where is the main campus?", "In town."]
+
+
+class ScriptedRuntime(BotRuntime):
+    """Stands in for the model and index build; fails while `fail` is set."""
+
+    def __init__(self, *args, **kwargs):
+        self.fail, self.builds = True, []
+        super().__init__(*args, **kwargs)
+
+    def _build(self, qna, previous=None, docs_changed=True):
+        self.builds.append(docs_changed)
+        if self.fail:
+            raise RuntimeError("model download failed")
+        return Snapshot(chain=object(), answer_cache=None, vectorstore=None)
+
+
+def test_failed_load_backs_off_until_data_changes(tmp_path, qna_file, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("runtime.time.monotonic", lambda: clock[0])
+    runtime = ScriptedRuntime(data_dir=tmp_path, qna_file=qna_file, index_dir=tmp_path / "index", interval=3600)
+    assert runtime.wait_ready(5) and runtime.snapshot is None
+    assert str(runtime.error) == "model download failed"
+    runtime.interval = 10
+
+    def poll():
+        try:
+            runtime._poll()
+        except RuntimeError:
+            pass
+        return len(runtime.builds)
+
+    clock[0] += 299
+    assert poll() == 1  # 2 * 3600 s, capped at RELOAD_MAX_BACKOFF
+    clock[0] += 1
+    assert poll() == 2
+    clock[0] += 39
+    assert poll() == 2
+    clock[0] += 1
+    assert poll() == 3
+    clock[0] += 80
+    assert poll() == 4 and runtime._retry_at - clock[0] == 160
+
+    (tmp_path / "fees.docx").write_text("Tuition is 100.", encoding="utf-8")
+    assert poll() == 5  # new data is tried straight away
+
+    runtime.fail = False
+    clock[0] += 20
+    assert poll() == 6 and runtime.snapshot is not None and runtime.error is None
+    assert poll() == 6 and runtime._failures == 0
+
+
+def test_reload_lists_documents_that_failed_to_parse(tmp_path, qna_file):
+    index_dir = tmp_path / "index"
+    save_manifest({"settings": {}, "files": {}, "failed": {"bad.docx": {"sha256": "0", "error": "BadZipFile"}}},
+                  index_dir)
+    runtime = ScriptedRuntime(data_dir=tmp_path, qna_file=qna_file, index_dir=index_dir, interval=3600)
+    runtime.wait_ready(5)
+    runtime.fail = False
+
+    (tmp_path / "bad.docx").write_text("CORRUPT", encoding="utf-8")
+    runtime._poll()
+
+    assert runtime.failed_files == {"bad.docx": "BadZipFile"}
+
+
+@pytest.fixture
+def loaded(tmp_path, qna_file, embeddings, monkeypatch):
+    refreshed = []
+    monkeypatch.setattr("index_store.make_embeddings", lambda: embeddings)
+    monkeypatch.setattr("mmap_index.load_vectorstore", FakeVectorStore)
+    monkeypatch.setattr("mmap_index.refresh_vectorstore", lambda store, _: refreshed.append(store) or store)
+    runtime = BotRuntime(llm_factory=LocalChatModel, data_dir=tmp_path, qna_file=qna_file,
+                         index_dir=tmp_path / "index", interval=3600)
+    assert runtime.wait_ready(5) and runtime.error is None
+    return runtime, refreshed
+
+
+def test_qna_change_swaps_in_a_new_answer_cache(loaded, qna_file):
+    runtime, refreshed = loaded
+    before, qna_before = runtime.snapshot, runtime.qna
+
+    qna_file.write_text(json.dumps({"Fees": [{"question": "What is the tuition fee?", "answer": "It is 120."}]}),
+                        encoding="utf-8")
+    runtime._poll()
+
+    after = runtime.snapshot
+    assert after is not before and runtime.reloads == 1 and refreshed == []
+    assert after.chain is before.chain and after.answer_cache is not before.answer_cache
+    assert after.answer_cache.match("What is the tuition fee?")[0] == "It is 120."
+    assert before.answer_cache.match("What is the tuition fee?")[0] == "It is 100."
+    assert qna_before.lookup("What is the tuition fee?") == "It is 100."
+
+
+def test_document_change_rebuilds_the_chain(loaded, tmp_path):
+    runtime, refreshed = loaded
+    before = runtime.snapshot
+
+    (tmp_path / "fees.docx").write_text("Tuition is 100.", encoding="utf-8")
+    runtime._poll()
+
+    assert refreshed == [before.vectorstore] and runtime.reloads == 1
+    assert runtime.snapshot.chain is not before.chain and runtime.qna is runtime.snapshot.answer_cache.qna
@@ -0,0 +1,196 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from answer_cache import SemanticAnswerCache
+from runtime import BotRuntime, Snapshot
+from server import ChatService, GenerationFailed, QueueFull
+
+QNA = {"Fees": [{"question": "What is the tuition fee?", "answer": "It is 100."}]}
+
+
+class ScriptedChain:
+    """Streams `tokens` once `release` is set, then raises `error` if given."""
+
+    def __init__(self, tokens=("An", " answer."), error=None):
+        self.tokens, self.error = tokens, error
+        self.release = asyncio.Event()
+        self.calls = []
+
+    async def astream(self, inputs, config):
+        self.calls.append(inputs["input"])
+        await self.release.wait()
+        for token in self.tokens:
+            yield {"answer": token}
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def runtime(tmp_path, embeddings):
+    qna_file = tmp_path / "qna.json"
+    qna_file.write_text(json.dumps(QNA), encoding="utf-8")
+    runtime = BotRuntime(load_bot=False, data_dir=tmp_path, qna_file=qna_file, interval=3600)
+    runtime.wait_ready()
+    cache = SemanticAnswerCache(embeddings, threshold=0.99)
+    cache.add_predefined(runtime.qna)
+    runtime.snapshot = Snapshot(ScriptedChain(), cache, None)
+    return runtime
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def collect(flight):
+    tokens = []
+    try:
+        async for token in flight.follow():
+            tokens.append(token)
+    except GenerationFailed:
+        tokens.append("<failed>")
+    return "".join(tokens)
+
+
+def test_identical_questions_share_one_generation(runtime):
+    chain = runtime.snapshot.chain
+
+    async def scenario():
+        service = ChatService(runtime)
+        first = await service.submit("a", "Where is the main campus?")
+        second = await service.submit("b", "Where is the main campus?")
+        chain.release.set()
+        answers = await asyncio.gather(collect(first), collect(second))
+        await asyncio.sleep(0)
+        return service, first, second, answers
+
+    service, first, second, answers = run(scenario())
+
+    assert first is second and service.coalesced == 1
+    assert answers == ["An answer.", "An answer."] and chain.calls == ["Where is the main campus?"]
+    # The joined session gets the exchange in its own memory.
+    assert [m.content for m in runtime.memory.get("b").messages] == ["Where is the main campus?", "An answer."]
+    assert not service.inflight and not service._tasks
+
+
+def test_generated_answer_is_cached_for_standalone_questions(runtime):
+    runtime.snapshot.chain.release.set()
+
+    async def scenario():
+        service = ChatService(runtime)
+        await collect(await service.submit("a", "Where is the main campus?"))
+        await asyncio.sleep(0)
+        return await collect(await service.submit("b", "Where is the main campus?"))
+
+    assert run(scenario()) == "An answer."
+    assert runtime.snapshot.chain.calls == ["Where is the main campus?"]
+
+
+def test_follow_up_to_a_predefined_answer_is_generated(runtime):
+    chain = runtime.snapshot.chain
+    chain.release.set()
+
+    async def scenario():
+        service = ChatService(runtime)
+        # Another session caches an answer to the same words.
+        await collect(await service.submit("other", "How much does that cost?"))
+        await asyncio.sleep(0)
+        assert await collect(await service.submit("s", "What is the tuition fee?")) == "It is 100."
+        return await collect(await service.submit("s", "How much does that cost?"))
+
+    assert run(scenario()) == "An answer."
+    assert chain.calls == ["How much does that cost?", "How much does that cost?"]
+
+
+def test_full_queue_is_rejected(runtime):
+    async def scenario():
+        service = ChatService(runtime, max_concurrency=1, max_queue=1)
+        running = await service.submit("a", "Where is the main campus?")
+        queued = await service.submit("b", "When does the term start?")
+        with pytest.raises(QueueFull):
+            await service.submit("c", "Is housing available?")
+        runtime.snapshot.chain.release.set()
+        return await asyncio.gather(collect(running), collect(queued))
+
+    assert run(scenario()) == ["An answer.", "An answer."]
+
+
+def test_failure_reaches_every_joined_request(runtime):
+    runtime.snapshot.chain.error = ValueError("model unavailable")
+
+    async def scenario():
+        service = ChatService(runtime)
+        first = await service.submit("a", "Where is the main campus?")
+        second = await service.submit("b", "Where is the main campus?")
+        runtime.snapshot.chain.release.set()
+        return await asyncio.gather(collect(first), collect(second))
+
+    assert run(scenario()) == ["An answer.<failed>", "An answer.<failed>"]
+    assert runtime.memory.get("b").messages == []
+
+
+def test_cancelled_generation_releases_joined_requests(runtime):
+    async def scenario():
+        service = ChatService(runtime)
+        flight = await service.submit("a", "Where is the main campus?")
+        await asyncio.sleep(0)
+        for task in list(service._tasks):
+            task.cancel()
+        return await asyncio.wait_for(collect(flight), 1)
+
+    assert run(scenario()) == "<failed>"
+
+
+# ------------------ HTTP API ------------------
+@pytest.fixture
+def client(runtime):
+    server.app.state.service = ChatService(runtime)
+    return TestClient(server.app)
+
+
+def test_chat_streams_the_answer(client, runtime):
+    runtime.snapshot.chain.release.set()
+
+    response = client.post("/chat", json={"session_id": "s", "input": "Where is the main campus?"})
+
+    assert (response.status_code, response.text) == (200, "An answer.")
+
+
+def test_failure_before_first_token_is_502(client, runtime):
+    runtime.snapshot.chain.tokens, runtime.snapshot.chain.error = (), ValueError("model unavailable")
+    runtime.snapshot.chain.release.set()
+
+    response = client.post("/chat", json={"session_id": "s", "input": "Where is the main campus?"})
+
+    assert response.status_code == 502
+    assert response.json()["detail"] == "The answer could not be generated, please try again."
+
+
+def test_failure_mid_answer_cuts_the_stream_off(client, runtime):
+    runtime.snapshot.chain.error = ValueError("model unavailable")
+    runtime.snapshot.chain.release.set()
+
+    with pytest.raises(Exception):
+        client.post("/chat", json={"session_id": "s", "input": "Where is the main campus?"})
+
+
+def test_full_queue_is_503(client, monkeypatch):
+    async def full(*_):
+        raise QueueFull()
+
+    monkeypatch.setattr(server.app.state.service, "submit", full)
+
+    assert client.post("/chat", json={"session_id": "s", "input": "hi"}).status_code == 503
+
+
+def test_unloaded_runtime_is_503(client, runtime):
+    runtime.snapshot, runtime.error = None, OSError("download failed")
+
+    response = client.post("/chat", json={"session_id": "s", "input": "Where is the main campus?"})
+
+    assert response.status_code == 503 and "download failed" in response.json()["detail"]
+    # Predefined questions still work.
+    assert client.post("/chat", json={"session_id": "s", "input": "What is the tuition fee?"}).text == "It is 100."